@@ -1,4 +1,6 @@
 import os
+import queue
+import threading
 import pandas as pd
 import joblib
 import torch
@@ -8,6 +10,9 @@ os.environ["OMP_NUM_THREADS"] = "1"
 os.environ["MKL_NUM_THREADS"] = "1"
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# inference only: no autograd bookkeeping anywhere in this script
+torch.set_grad_enabled(False)
+
 PROJECT_ROOT = os.path.abspath(os.path.join(os.getcwd(), "..", ".."))
 DATA_DIR = os.path.join(PROJECT_ROOT, "Data")
 CODE_DIR = os.path.join(PROJECT_ROOT, "Code")
@@ -16,45 +21,175 @@ MODEL_PKL = os.path.join(CODE_DIR, "bert_email_classifier.pkl")
 INPUT_FILE = os.path.join(DATA_DIR, "gmail_subject_body_date.xlsx")
 OUTPUT_FILE = os.path.join(DATA_DIR, "mail_classified3.xlsx")
 
-print(f"[INFO] Loading model from: {MODEL_PKL}")
-
-class EmailClassifierWrapper:
-    def __init__(self, model=None, tokenizer=None):
-        self.model = model
-        self.tokenizer = tokenizer
-
-wrapper = joblib.load(MODEL_PKL)
-model = wrapper.model
-tokenizer = wrapper.tokenizer
-model.eval()
-
-print("[INFO] Model loaded.")
+BATCH_SIZE = 64
+MAX_LENGTH = 256
+PREFETCH_BATCHES = 4
 
-df = pd.read_excel(INPUT_FILE)
+if torch.cuda.is_available():
+    DEVICE = "cuda"
+elif torch.backends.mps.is_available():
+    DEVICE = "mps"
+else:
+    DEVICE = "cpu"
 
-df["subject"] = df["subject"].fillna("")
-df["body"] = df["body"].fillna("")
-df["text"] = df["subject"] + " " + df["body"]
+# fp16 autocast on CUDA; MPS autocast is not available in torch 2.3, so cast weights instead
+USE_AUTOCAST = DEVICE == "cuda"
 
-print(f"[INFO] Loaded {len(df)} samples for prediction.")
+# reduce-overhead relies on CUDA graphs; every batch is padded to MAX_LENGTH so shapes stay static
+USE_COMPILE = DEVICE == "cuda"
 
-preds = []
-probs = []
+_model = None
+_tokenizer = None
 
-for text in df["text"]:
-    enc = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=256)
-    with torch.no_grad():
-        logits = model(**enc).logits
-        prob = torch.softmax(logits, dim=1)[0][1].item()
-        pred = int(torch.argmax(logits))
-    preds.append(pred)
-    probs.append(prob)
 
-df["job_label"] = preds
-df["prob_job"] = probs
-df["predicted_label"] = df["job_label"].map({1: "job", 0: "non_job"})
+class EmailClassifierWrapper:
+    def __init__(self, model=None, tokenizer=None):
+        self.model = model
+        self.tokenizer = tokenizer
 
-print("[INFO] Predictions complete.")
 
-df.to_excel(OUTPUT_FILE, index=False)
-print(f"[INFO] Saved predictions to: {OUTPUT_FILE}")
+def _get_model():
+    """Load the pickled wrapper once per process and keep the prepared model around."""
+    global _model, _tokenizer
+
+    if _model is None:
+        print(f"[INFO] Loading model from: {MODEL_PKL}")
+        wrapper = joblib.load(MODEL_PKL)
+        model = wrapper.model
+        model.eval()
+
+        if DEVICE == "cpu":
+            # int8 weights for the Linear layers; encoder-only models quantize with negligible accuracy loss
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        elif DEVICE == "mps":
+            model.half()
+        model.to(DEVICE)
+
+        if USE_COMPILE:
+            model = torch.compile(model, mode="reduce-overhead", fullgraph=False)
+
+        _model = model
+        _tokenizer = wrapper.tokenizer
+        print(f"[INFO] Model loaded on {DEVICE}.")
+
+        if USE_COMPILE:
+            print("[INFO] Compiling model (warm-up batch)...")
+            _forward(_tokenize([""] * BATCH_SIZE))
+
+    return _model, _tokenizer
+
+
+def _tokenize(batch_texts):
+    enc = _tokenizer(
+        batch_texts,
+        return_tensors="pt",
+        truncation=True,
+        padding="max_length" if USE_COMPILE else True,
+        max_length=MAX_LENGTH,
+    )
+    if DEVICE == "cuda":
+        # pinned host memory lets the copy to the GPU run asynchronously
+        enc = {k: v.pin_memory() for k, v in enc.items()}
+    return enc
+
+
+def _forward(enc):
+    enc = {k: v.to(DEVICE, non_blocking=True) for k, v in enc.items()}
+    with torch.inference_mode(), torch.autocast(
+        device_type="cuda" if USE_AUTOCAST else "cpu",
+        dtype=torch.float16,
+        enabled=USE_AUTOCAST,
+    ):
+        return _model(**enc).logits.float()
+
+
+def predict_texts(texts):
+    """
+    Return (labels, job probabilities) for a list of texts.
+    A background thread tokenizes upcoming batches while the model runs the current one.
+    Texts are batched in length order so each batch only pads to its own longest text.
+    """
+    _get_model()
+
+    # character length is a cheap proxy for token length (no extra tokenizer pass)
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+    batches = queue.Queue(maxsize=PREFETCH_BATCHES)
+    errors = []
+    # set when the consumer bails out, so a producer blocked on a full queue exits
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def producer():
+        try:
+            for i in range(0, len(order), BATCH_SIZE):
+                if not put(_tokenize([texts[j] for j in order[i:i + BATCH_SIZE]])):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(None)
+
+    worker = threading.Thread(target=producer, daemon=True)
+    worker.start()
+
+    preds = []
+    probs = []
+    try:
+        while True:
+            enc = batches.get()
+            if enc is None:
+                break
+            logits = _forward(enc)
+            preds.extend(logits.argmax(dim=1).cpu().tolist())
+            probs.extend(torch.softmax(logits, dim=1)[:, 1].cpu().tolist())
+    finally:
+        stop.set()
+        worker.join()
+
+    if errors:
+        raise errors[0]
+
+    # scatter results back to the original row order
+    preds_out = [0] * len(texts)
+    probs_out = [0.0] * len(texts)
+    for pos, idx in enumerate(order):
+        preds_out[idx] = preds[pos]
+        probs_out[idx] = probs[pos]
+
+    return preds_out, probs_out
+
+
+def main():
+    df = pd.read_excel(INPUT_FILE)
+
+    df["subject"] = df["subject"].fillna("")
+    df["body"] = df["body"].fillna("")
+    df["text"] = df["subject"] + " " + df["body"]
+
+    print(f"[INFO] Loaded {len(df)} samples for prediction.")
+
+    preds, probs = predict_texts(df["text"].tolist())
+
+    df["job_label"] = preds
+    df["prob_job"] = probs
+    df["predicted_label"] = df["job_label"].map({1: "job", 0: "non_job"})
+
+    print("[INFO] Predictions complete.")
+
+    df.to_excel(OUTPUT_FILE, index=False)
+    print(f"[INFO] Saved predictions to: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+import onnxruntime as ort
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from transformers import DistilBertTokenizerFast
+
+
+os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.getcwd(), "..", ".."))
+DATA_DIR = os.path.join(PROJECT_ROOT, "Data")
+MODEL_DIR = os.path.join(PROJECT_ROOT, "bert_email_classifier")
+ONNX_DIR = os.path.join(PROJECT_ROOT, "bert_email_classifier_onnx")
+
+ONNX_PATH = os.path.join(ONNX_DIR, "model.onnx")
+INT8_ONNX_PATH = os.path.join(ONNX_DIR, "model.int8.onnx")
+INPUT_FILE = os.path.join(DATA_DIR, "gmail_subject_body_date.xlsx")
+OUTPUT_FILE = os.path.join(DATA_DIR, "mail_classified3.xlsx")
+
+BATCH_SIZE = 64
+MAX_LENGTH = 256
+
+# int8 kernels only pay off on CPU; with a GPU provider keep the fp32 graph
+USE_INT8 = "CUDAExecutionProvider" not in ort.get_available_providers()
+
+_session = None
+_tokenizer = None
+
+
+def export_onnx():
+    """
+    One-shot export of the fine-tuned DistilBERT (saved by training.py) to ONNX.
+    Batch and sequence axes are dynamic so any batch shape can be fed.
+    """
+    import torch
+    from transformers import DistilBertForSequenceClassification
+
+    print(f"[INFO] Exporting {MODEL_DIR} to ONNX: {ONNX_PATH}")
+    os.makedirs(ONNX_DIR, exist_ok=True)
+
+    tokenizer = DistilBertTokenizerFast.from_pretrained(MODEL_DIR)
+    model = DistilBertForSequenceClassification.from_pretrained(MODEL_DIR)
+    model.eval()
+
+    dummy = tokenizer(["export"], return_tensors="pt")
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        ONNX_PATH,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=14,
+    )
+    tokenizer.save_pretrained(ONNX_DIR)
+    print("[INFO] ONNX export complete.")
+
+
+def quantize_onnx():
+    """Dynamic int8 quantization of the exported graph's weights (activations stay fp32)."""
+    print(f"[INFO] Quantizing {ONNX_PATH} to int8: {INT8_ONNX_PATH}")
+    quantize_dynamic(ONNX_PATH, INT8_ONNX_PATH, weight_type=QuantType.QInt8)
+    print("[INFO] Quantization complete.")
+
+
+def _get_session():
+    """Create the ONNX Runtime session once and reuse it across calls."""
+    global _session, _tokenizer
+
+    if _session is None:
+        if not os.path.exists(ONNX_PATH):
+            export_onnx()
+        if USE_INT8 and not os.path.exists(INT8_ONNX_PATH):
+            quantize_onnx()
+
+        _session = ort.InferenceSession(
+            INT8_ONNX_PATH if USE_INT8 else ONNX_PATH,
+            providers=["CUDAExecutionProvider", "CPUExecutionProvider"],
+        )
+        _tokenizer = DistilBertTokenizerFast.from_pretrained(ONNX_DIR)
+        print(f"[INFO] ONNX session ready ({_session.get_providers()[0]}, "
+              f"{'int8' if USE_INT8 else 'fp32'}).")
+
+    return _session, _tokenizer
+
+
+def predict_texts(texts):
+    """Return (labels, job probabilities) for a list of texts."""
+    session, tokenizer = _get_session()
+
+    preds = []
+    probs = []
+    for i in range(0, len(texts), BATCH_SIZE):
+        enc = tokenizer(
+            texts[i:i + BATCH_SIZE],
+            return_tensors="np",
+            truncation=True,
+            padding=True,
+            max_length=MAX_LENGTH,
+        )
+        logits = session.run(
+            ["logits"],
+            {
+                "input_ids": enc["input_ids"].astype(np.int64),
+                "attention_mask": enc["attention_mask"].astype(np.int64),
+            },
+        )[0]
+
+        # numerically stable softmax
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        batch_probs = exp[:, 1] / exp.sum(axis=1)
+
+        preds.extend(logits.argmax(axis=1).tolist())
+        probs.extend(batch_probs.tolist())
+
+    return preds, probs
+
+
+def main():
+    df = pd.read_excel(INPUT_FILE)
+
+    df["subject"] = df["subject"].fillna("")
+    df["body"] = df["body"].fillna("")
+    df["text"] = df["subject"] + " " + df["body"]
+
+    print(f"[INFO] Loaded {len(df)} samples for prediction.")
+
+    preds, probs = predict_texts(df["text"].tolist())
+
+    df["job_label"] = preds
+    df["prob_job"] = probs
+    df["predicted_label"] = df["job_label"].map({1: "job", 0: "non_job"})
+
+    print("[INFO] Predictions complete.")
+
+    df.to_excel(OUTPUT_FILE, index=False)
+    print(f"[INFO] Saved predictions to: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import multiprocessing
 import pandas as pd
 import joblib
 import torch
@@ -7,7 +8,8 @@ from transformers import (
     DistilBertTokenizerFast,
     DistilBertForSequenceClassification,
     TrainingArguments,
-    Trainer
+    Trainer,
+    DataCollatorWithPadding
 )
 
 
@@ -54,9 +56,22 @@ tokenizer = DistilBertTokenizerFast.from_pretrained(model_name)
 model = DistilBertForSequenceClassification.from_pretrained(model_name, num_labels=2)
 
 def tokenize(batch):
-    return tokenizer(batch["text"], truncation=True, padding="max_length", max_length=256)
-
-dataset = dataset.map(tokenize, batched=True)
+    # no padding here: the collator pads each batch to its own longest sequence
+    return tokenizer(batch["text"], truncation=True, max_length=256)
+
+# This file runs at top level, so worker processes are only safe with fork
+# (spawn, the macOS/Windows default, would re-execute the whole script).
+num_proc = None
+if multiprocessing.get_start_method() == "fork":
+    num_proc = max(1, (os.cpu_count() or 1) // 2)
+
+dataset = dataset.map(
+    tokenize,
+    batched=True,
+    batch_size=1000,
+    num_proc=num_proc,
+    remove_columns=["text"],
+)
 
 #Train
 args = TrainingArguments(
@@ -69,10 +84,13 @@ args = TrainingArguments(
     save_strategy="no"
 )
 
+collator = DataCollatorWithPadding(tokenizer=tokenizer, pad_to_multiple_of=8)
+
 trainer = Trainer(
     model=model,
     args=args,
     train_dataset=dataset,
+    data_collator=collator,
 )
 
 trainer.train()
@@ -92,7 +110,7 @@ class EmailClassifierWrapper:
 
     def predict(self, text):
         inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=256)
-        with torch.no_grad():
+        with torch.inference_mode():
             logits = self.model(**inputs).logits
         prob = torch.softmax(logits, dim=1)[0][1].item()
         label = int(torch.argmax(logits))
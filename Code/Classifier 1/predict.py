@@ -54,7 +54,7 @@ if not os.path.exists(model_path):
     sys.exit(1)
 
 print(f"[INFO] Loading model: {model_path}")
-model = joblib.load(model_path)
+model = joblib.load(model_path, mmap_mode="r")
 
 # -----------------------------
 # 4. PREDICT ON UNCLEANED DATASET
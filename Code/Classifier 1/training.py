@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import joblib
 from sklearn.model_selection import train_test_split
@@ -94,9 +95,11 @@ pipeline = Pipeline([
         max_features=30000,
         ngram_range=(1, 2),
         min_df=2,
-        stop_words="english"
+        stop_words="english",
+        dtype=np.float32
     )),
     ("clf", LogisticRegression(
+        solver="liblinear",
         max_iter=300,
         C=2.0,
         class_weight="balanced"
@@ -120,7 +123,8 @@ print(confusion_matrix(y_test, preds))
 # Model Save
 
 model_path = "job_classifier_baseline.pkl"
-joblib.dump(pipeline, model_path)
+# uncompressed + protocol 5 so the arrays can be memory-mapped on load
+joblib.dump(pipeline, model_path, protocol=5)
 
 print(f"\n[INFO] Model saved to {model_path}")
 print("[INFO] Done.")
\ No newline at end of file
@@ -57,11 +57,11 @@ JOB_PROCESS_PATTERNS = [
     r"\bwe are currently reviewing\b.*\bapplication\b",
 
     # "we just received your ..." style
-    r"\bwe just received\b.*\b(your information|your application|your submission)\b",
+    r"\bwe just received\b.*\b(?:your information|your application|your submission)\b",
 
     # explicit "your application" + position/role
-    r"\byour application\b.*\b(position|role|opening|opportunity)\b",
-    r"\bapplication\b.*\b(position|role|opening|opportunity)\b",
+    r"\byour application\b.*\b(?:position|role|opening|opportunity)\b",
+    r"\bapplication\b.*\b(?:position|role|opening|opportunity)\b",
 
     # interview / assessment
     r"\binterview invitation\b",
@@ -146,34 +146,26 @@ CORE_JOB_KEYWORDS = [
 ]
 
 
-def normalize(t: str) -> str:
-    if t is None:
-        return ""
-    t = str(t)
-    t = t.lower()
-    t = re.sub(r"\s+", " ", t)
-    return t.strip()
+def compile_any(patterns) -> re.Pattern:
+    """Merge a pattern list into one compiled alternation (a single scan per text)."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
 
 
-def safe_str(x) -> str:
-    """Convert any value (including NaN) safely to string."""
-    if pd.isna(x):
-        return ""
-    return str(x)
+WHITESPACE_RE = re.compile(r"\s+")
+JOB_PROCESS_RE = compile_any(JOB_PROCESS_PATTERNS)
+JOB_ALERT_RE = compile_any(JOB_ALERT_PATTERNS)
+CORE_JOB_KEYWORD_RE = compile_any(re.escape(k) for k in CORE_JOB_KEYWORDS)
 
 
-def combine(subject, body) -> str:
-    s = safe_str(subject)
-    b = safe_str(body)
-    return normalize(s + "\n" + b)
+def safe_str_series(s: pd.Series) -> pd.Series:
+    """Convert any column (including NaN) safely to strings."""
+    return s.where(s.notna(), "").astype(str)
 
 
-def matches_any(patterns, text: str) -> bool:
-    return any(re.search(p, text) for p in patterns)
-
-
-def contains_keyword(text: str, keywords) -> bool:
-    return any(k in text for k in keywords)
+def combine_columns(df: pd.DataFrame, subject_col: str, body_col: str) -> pd.Series:
+    """Vectorized subject + body → lowercased, whitespace-normalized text."""
+    text = safe_str_series(df[subject_col]) + "\n" + safe_str_series(df[body_col])
+    return text.str.lower().str.replace(WHITESPACE_RE, " ", regex=True).str.strip()
 
 
 def main():
@@ -204,62 +196,62 @@ def main():
         )
 
     # Combine subject+body → full training text
-    df_jobs["full_text"] = df_jobs.apply(
-        lambda r: combine(r[JOBS_SUBJECT_COL], r[JOBS_BODY_COL]),
-        axis=1,
-    )
+    df_jobs["full_text"] = combine_columns(df_jobs, JOBS_SUBJECT_COL, JOBS_BODY_COL)
     df_jobs = df_jobs[df_jobs["full_text"].str.strip() != ""]
 
     # Combine subject+body → full Gmail text
-    df_gmail["full_text"] = df_gmail.apply(
-        lambda r: combine(r[GMAIL_SUBJECT_COL], r[GMAIL_BODY_COL]),
-        axis=1,
-    )
+    df_gmail["full_text"] = combine_columns(df_gmail, GMAIL_SUBJECT_COL, GMAIL_BODY_COL)
 
     print(f"Loaded {len(df_jobs)} training job emails.")
     print(f"Loaded {len(df_gmail)} Gmail emails.\n")
 
-    print("Loading embedding model...")
-    model = SentenceTransformer(MODEL_NAME)
+    texts = df_gmail["full_text"]
 
-    print("Encoding job examples...")
-    job_emb = model.encode(
-        df_jobs["full_text"].tolist(),
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-    )
+    # 1) Strong job-process → always job
+    process_mask = texts.str.contains(JOB_PROCESS_RE, regex=True, na=False).to_numpy()
+    # 2) Strong job-alert → always non_job
+    alert_mask = texts.str.contains(JOB_ALERT_RE, regex=True, na=False).to_numpy()
+    keyword_mask = texts.str.contains(CORE_JOB_KEYWORD_RE, regex=True, na=False).to_numpy()
 
-    print("Encoding Gmail messages...")
-    gmail_emb = model.encode(
-        df_gmail["full_text"].tolist(),
-        convert_to_numpy=True,
-        normalize_embeddings=True,
-    )
+    # 3) Strict similarity logic (rescue true jobs only). It can only change the
+    #    label of rows the rules above leave open and that carry a core job
+    #    keyword, so only those rows are embedded.
+    needs_sim = ~process_mask & ~alert_mask & keyword_mask
+    max_sims = np.zeros(len(df_gmail), dtype=np.float32)
 
-    print("Calculating similarities...")
-    sim_matrix = cosine_similarity(gmail_emb, job_emb)
-    max_sims = sim_matrix.max(axis=1)
+    print(f"Rows decided by rules: {int((process_mask | alert_mask).sum())}, "
+          f"needing similarity: {int(needs_sim.sum())}")
 
-    final_labels = []
+    if needs_sim.any():
+        print("Loading embedding model...")
+        model = SentenceTransformer(MODEL_NAME)
 
-    for text, sim in zip(df_gmail["full_text"], max_sims):
-        # 1) Strong job-process → always job
-        if matches_any(JOB_PROCESS_PATTERNS, text):
-            final_labels.append("job")
-            continue
+        print("Encoding job examples...")
+        job_emb = model.encode(
+            df_jobs["full_text"].tolist(),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
 
-        # 2) Strong job-alert → always non_job
-        if matches_any(JOB_ALERT_PATTERNS, text):
-            final_labels.append("non_job")
-            continue
+        print("Encoding Gmail messages...")
+        gmail_emb = model.encode(
+            texts[needs_sim].tolist(),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
 
-        # 3) Strict similarity logic (rescue true jobs only)
-        if sim >= VERY_HIGH_SIM_THRESHOLD and contains_keyword(text, CORE_JOB_KEYWORDS):
-            final_labels.append("job")
-        else:
-            final_labels.append("non_job")
+        print("Calculating similarities...")
+        sim_matrix = cosine_similarity(gmail_emb, job_emb)
+        max_sims[needs_sim] = sim_matrix.max(axis=1)
 
-    df_gmail["job_label"] = final_labels
+    similar_mask = needs_sim & (max_sims >= VERY_HIGH_SIM_THRESHOLD)
+
+    # np.select takes the first matching condition, same precedence as the rules above
+    df_gmail["job_label"] = np.select(
+        [process_mask, alert_mask, similar_mask],
+        ["job", "non_job", "job"],
+        default="non_job",
+    )
 
     df_gmail.to_excel(OUTPUT_FILE, index=False)
     print(f"\n[✓] Saved to {OUTPUT_FILE}")
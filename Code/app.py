@@ -9,6 +9,7 @@ import streamlit as st
 # ---- import your existing modules (NO CHANGES to them) ----
 import gmail_read
 from gmail_read import GmailLiveReader, QUERY, OUTPUT_EXCEL  # reuse your constants
+from table_io import parquet_sidecar, read_export, write_export
 import predict
 import ner
 import rag  # this gives us rag.ask()
@@ -21,10 +22,21 @@ os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(CHROMA_DIR, exist_ok=True)
 
 
+def _mtime(path: str) -> float:
+    return os.path.getmtime(path) if os.path.exists(path) else 0.0
+
+
+# bounded: every new mtime is a new key, and stale frames would otherwise pile up
+@st.cache_data(show_spinner=False, max_entries=4, ttl=3600)
+def _read_table_cached(path: str, mtime: float, sidecar_mtime: float) -> pd.DataFrame:
+    # mtimes are only part of the cache key: the file is re-read only when it changes
+    return read_export(path)
+
+
 def _safe_read_excel(path: str) -> pd.DataFrame:
-    if os.path.exists(path):
+    if os.path.exists(path) or os.path.exists(parquet_sidecar(path)):
         try:
-            return pd.read_excel(path)
+            return _read_table_cached(path, _mtime(path), _mtime(parquet_sidecar(path)))
         except Exception as e:
             st.error(f"Error reading {path}: {e}")
             return pd.DataFrame()
@@ -41,6 +53,7 @@ def _last_modified(path: str) -> str:
 def _flush_all() -> tuple[int, bool]:
     files = [
         os.path.join(DATA_DIR, "gmail_subject_body_date.xlsx"),
+        os.path.join(DATA_DIR, "gmail_subject_body_date.parquet"),
         os.path.join(DATA_DIR, "mail_classified.xlsx"),
         os.path.join(DATA_DIR, "mail_classified_llm_parsed.xlsx"),
     ]
@@ -49,7 +62,11 @@ def _flush_all() -> tuple[int, bool]:
     for f in files:
         if os.path.exists(f):
             try:
-                os.remove(f)
+                # the Parquet sidecar is a directory of part files
+                if os.path.isdir(f):
+                    shutil.rmtree(f)
+                else:
+                    os.remove(f)
                 deleted_count += 1
             except Exception as e:
                 st.error(f"Failed to delete {f}: {e}")
@@ -238,9 +255,13 @@ def fetch_new_emails_once(query: str = QUERY):
         gmail_account_index=0,
     )
 
-    # Load existing Excel if present
+    # Load existing Excel (or its Parquet sidecar) if present. Goes through the
+    # same mtime-keyed cache as the table views, so repeated fetches don't
+    # re-parse an export that hasn't changed since the last click.
     if os.path.exists(OUTPUT_EXCEL):
-        master_df = pd.read_excel(OUTPUT_EXCEL)
+        master_df = _read_table_cached(
+            OUTPUT_EXCEL, _mtime(OUTPUT_EXCEL), _mtime(parquet_sidecar(OUTPUT_EXCEL))
+        )
         if "id" in master_df.columns:
             seen_ids = set(master_df["id"].astype(str).tolist())
         else:
@@ -270,7 +291,7 @@ def fetch_new_emails_once(query: str = QUERY):
 
     # Append and save
     master_df = pd.concat([master_df, df_new], ignore_index=True)
-    master_df.to_excel(OUTPUT_EXCEL, index=False)
+    write_export(master_df, OUTPUT_EXCEL)
 
     st.success(f"Appended {len(df_new)} new email(s) to {OUTPUT_EXCEL}")
     st.subheader("Newly fetched emails for this query")
@@ -432,7 +453,7 @@ def page_fetch_and_classify():
     with st.expander("⚠️ Flush all data & Chroma store"):
         st.warning(
             "This will delete:\n\n"
-            "- `Data/gmail_subject_body_date.xlsx`\n"
+            "- `Data/gmail_subject_body_date.xlsx` (and its `.parquet` copy)\n"
             "- `Data/mail_classified.xlsx`\n"
             "- `Data/mail_classified_llm_parsed.xlsx`\n"
             "- Entire `chroma_store/` directory\n\n"
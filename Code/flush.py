@@ -17,6 +17,7 @@ EXCEL_PATTERNS = [
     "mail_classified*.xlsx",
     "mail_classified_llm_parsed.xlsx",
     "gmail_subject_body_date.xlsx",
+    "gmail_subject_body_date.parquet",
 ]
 
 def flush_chroma_folder():
@@ -56,7 +57,11 @@ def flush_data_files():
         for path in glob.glob(full_pattern):
             try:
                 print(f"Deleting file: {path}")
-                os.remove(path)
+                # the Parquet sidecar is a directory of part files
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
                 deleted_any = True
             except Exception as e:
                 print(f"Error deleting {path}: {e}")
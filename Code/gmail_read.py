@@ -1,18 +1,34 @@
 from __future__ import print_function
 import os
-import base64
+import sys
+import codecs
+import functools
+import pybase64
 import time
 import re
+import threading
 import pandas as pd
-from email import message_from_bytes
+from concurrent.futures import ThreadPoolExecutor
 from email.utils import parseaddr
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
-from bs4 import BeautifulSoup
+from googleapiclient.errors import HttpError
+from bs4 import BeautifulSoup, FeatureNotFound
+
+from table_io import (
+    append_export, export_excel, parquet_sidecar, read_export, read_export_ids, write_export,
+)
+
+# selectolax's lexbor backend (the old Modest `selectolax.parser` was removed in
+# 1.0); without it html_to_text uses BeautifulSoup only
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 
 
 DEFAULT_SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
@@ -23,6 +39,23 @@ QUERY = "after:2025/10/28"
 
 INTERVAL = 60  
 
+# refresh the OAuth access token this long before it expires
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+TOKEN_REFRESH_RETRY = 60
+
+# messages per Gmail batch request (API max is 100; >50 tends to hit rate limits)
+BATCH_SIZE = 50
+
+# retries (exponential backoff, done by googleapiclient) on 429 / 5xx responses
+API_RETRIES = 5
+
+# threads for fetching messages one by one (retries of failed batch items)
+FETCH_WORKERS = 10
+# batch requests in flight at once; Gmail throttles heavy per-user concurrency
+BATCH_WORKERS = 4
+# polls a failed message is re-requested on before it is given up (e.g. deleted)
+FETCH_MAX_ATTEMPTS = 5
+
 
 code_dir = os.getcwd()
 project_root = os.path.dirname(code_dir)
@@ -34,6 +67,43 @@ OUTPUT_EXCEL = os.path.join(data_dir, "gmail_subject_body_date.xlsx")
 
 
 _ILLEGAL_XML_RE = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F]")
+_CHARSET_RE = re.compile(r"charset=\"?([^\";\s]+)", re.IGNORECASE)
+
+
+# parser for the BeautifulSoup fallback in html_to_text, resolved once:
+# lxml when it is installed, else the pure-Python stdlib parser
+try:
+    BeautifulSoup("", "lxml")
+    BS4_PARSER = "lxml"
+except FeatureNotFound:
+    BS4_PARSER = "html.parser"
+
+
+# mail that declares latin-1 is nearly always cp1252 (smart quotes, euro sign)
+CHARSET_ALIASES = {
+    "iso-8859-1": "cp1252",
+    "latin-1": "cp1252",
+    "latin1": "cp1252",
+    "us-ascii": "utf-8",
+    "ascii": "utf-8",
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _decoder_for(charset):
+    """Resolve a declared charset to its codec decode function, once per charset."""
+    charset = charset.strip().lower()
+    charset = CHARSET_ALIASES.get(charset, charset)
+    try:
+        return codecs.lookup(charset).decode
+    except LookupError:
+        return codecs.lookup("utf-8").decode
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_sender(from_header):
+    """parseaddr for From headers; senders repeat a lot (job boards, ATS systems)."""
+    return parseaddr(from_header)
 
 
 def clean_for_excel(value, max_len=32000):
@@ -47,20 +117,50 @@ def clean_for_excel(value, max_len=32000):
     return value
 
 
+def clean_frame_for_excel(df, max_len=32000):
+    """clean_for_excel over every text column at once (vectorized, in place)."""
+    for col in df.select_dtypes(include=["object"]).columns:
+        s = df[col]
+        df[col] = (
+            s.where(s.notna(), "")
+            .astype(str)
+            .str.replace(_ILLEGAL_XML_RE, "", regex=True)
+            .str.slice(0, max_len)
+        )
+    return df
+
+
 class GmailLiveReader:
     def __init__(
         self,
         credentials_path="credentials.json",
         token_path="token.json",
         gmail_account_index=0,
+        auto_refresh=False,
     ):
+        """
+        auto_refresh: keep the access token fresh from a background timer, so a
+        long-running polling loop never blocks on a refresh. Leave off for
+        short-lived readers.
+        """
         self.credentials_path = os.path.abspath(credentials_path)
         self.token_path = os.path.abspath(token_path)
         self.gmail_account_index = gmail_account_index
         self.gmail_web_base = f"https://mail.google.com/mail/u/{gmail_account_index}/#all/"
         self.scopes = DEFAULT_SCOPES
 
+        self.creds = None
         self.service = self._authenticate()
+        # httplib2 is not thread-safe: worker threads each build their own client
+        self._local = threading.local()
+        # ids whose fetch failed -> attempts so far; re-requested on later polls
+        # even when list_ids stops before the page that holds them
+        self._failed_ids = {}
+        # queries listed to the end at least once (stop_at is only safe after that)
+        self._fully_listed = set()
+
+        if auto_refresh:
+            self._schedule_refresh()
 
 
     def _authenticate(self):
@@ -78,25 +178,78 @@ class GmailLiveReader:
                 )
                 creds = flow.run_local_server(port=0)
 
-            with open(self.token_path, "w") as f:
-                f.write(creds.to_json())
+            self._save_token(creds)
 
+        self.creds = creds
         return build("gmail", "v1", credentials=creds)
 
+    def _save_token(self, creds):
+        # write-then-rename so a crash never leaves a half-written token.json
+        tmp_path = self.token_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(creds.to_json())
+        os.replace(tmp_path, self.token_path)
+
+    def _schedule_refresh(self, delay=None):
+        if not self.creds.refresh_token:
+            return
+        if delay is None:
+            if not self.creds.expiry:
+                return
+            # google-auth keeps expiry as a naive datetime in UTC; make it aware
+            # rather than comparing against the deprecated datetime.utcnow()
+            expiry = self.creds.expiry.replace(tzinfo=timezone.utc)
+            remaining = expiry - TOKEN_REFRESH_MARGIN - datetime.now(timezone.utc)
+            delay = max(remaining.total_seconds(), 0)
+
+        timer = threading.Timer(delay, self._refresh_token)
+        timer.daemon = True
+        timer.start()
+
+    def _refresh_token(self):
+        try:
+            self.creds.refresh(Request())
+            self._save_token(self.creds)
+            print("[AUTH] Access token refreshed.")
+        except Exception as e:
+            print(f"[WARN] Background token refresh failed: {e}")
+            self._schedule_refresh(delay=TOKEN_REFRESH_RETRY)
+            return
+        self._schedule_refresh()
+
 
     @staticmethod
     def html_to_text(html):
         if not html:
             return ""
-        soup = BeautifulSoup(html, "html.parser")
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        return " ".join(soup.get_text(separator=" ", strip=True).split())
-
-    def list_ids(self, query):
+        text = None
+        if LexborHTMLParser is not None:
+            try:
+                tree = LexborHTMLParser(html)
+                for tag in tree.css("script, style"):
+                    tag.decompose()
+                root = tree.body or tree.root
+                text = root.text(separator=" ") if root is not None else ""
+            except Exception:
+                # selectolax chokes on some malformed mail; bs4 is slower but lenient
+                text = None
+
+        if text is None:
+            soup = BeautifulSoup(html, BS4_PARSER)
+            for tag in soup(["script", "style"]):
+                tag.decompose()
+            text = soup.get_text(separator=" ", strip=True)
+        return " ".join(text.split())
+
+    def list_ids(self, query, stop_at=None):
         """
         Return a list of *all* message IDs matching the query.
         Handles pagination via nextPageToken.
+
+        If stop_at (a set of already-known IDs) is given, paging stops after
+        the first page that contains a known ID. Gmail lists newest first, so
+        for a fixed query the remaining pages only hold mail seen on an
+        earlier poll.
         """
         ids = []
         page_token = None
@@ -108,9 +261,14 @@ class GmailLiveReader:
                 maxResults=500,        
                 pageToken=page_token,    
                 includeSpamTrash=True,
-            ).execute()
+                fields="messages/id,nextPageToken",
+            ).execute(num_retries=API_RETRIES)
+
+            page_ids = [m["id"] for m in response.get("messages", [])]
+            ids.extend(page_ids)
 
-            ids.extend([m["id"] for m in response.get("messages", [])])
+            if stop_at and any(mid in stop_at for mid in page_ids):
+                break
 
             page_token = response.get("nextPageToken")
             if not page_token:
@@ -119,17 +277,140 @@ class GmailLiveReader:
         print(f"[DEBUG] list_ids → found {len(ids)} messages for query: {query}")
         return ids
 
-    def get_details(self, msg_id):
-        msg = self.service.users().messages().get(
-            userId="me", id=msg_id, format="raw"
-        ).execute()
+    def _thread_service(self):
+        """Gmail client owned by the calling thread (sharing the same credentials)."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = build("gmail", "v1", credentials=self.creds, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def get_details(self, msg_id, service=None):
+        service = service or self.service
+        msg = service.users().messages().get(
+            userId="me", id=msg_id, format="full", fields="id,payload"
+        ).execute(num_retries=API_RETRIES)
+        return self.parse_message(msg)
+
+    def get_details_parallel(self, msg_ids):
+        """
+        Fetch messages one request each, FETCH_WORKERS at a time.
+        Returns {msg_id: details}; messages that failed to fetch are left out.
+        """
+        def fetch(mid):
+            try:
+                return mid, self.get_details(mid, service=self._thread_service())
+            except Exception as e:
+                print(f"[WARN] Could not fetch message {mid}: {e}")
+                return mid, None
+
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+            fetched = list(ex.map(fetch, msg_ids))
+
+        return {mid: details for mid, details in fetched if details is not None}
+
+    def _fetch_one_batch(self, chunk):
+        """Run one batch request on this thread's client. Returns (results, failed ids)."""
+        service = self._thread_service()
+        results = {}
+        failed = []
+
+        def on_message(request_id, response, exception):
+            if exception is not None:
+                failed.append(request_id)
+                return
+            results[request_id] = self.parse_message(response)
+
+        batch = service.new_batch_http_request(callback=on_message)
+        for mid in chunk:
+            batch.add(
+                service.users().messages().get(
+                    userId="me", id=mid, format="full", fields="id,payload"
+                ),
+                request_id=mid,
+            )
+        try:
+            batch.execute()
+        except HttpError as e:
+            # the whole batch was rejected (429 / 5xx): hand its items to
+            # the per-message path, which retries with backoff
+            print(f"[WARN] Batch request failed: {e}")
+            failed = [mid for mid in chunk if mid not in results]
+
+        return results, failed
+
+    def get_details_batch(self, msg_ids):
+        """
+        Fetch and parse many messages, BATCH_SIZE per HTTP round-trip, with up
+        to BATCH_WORKERS batches in flight.
+        Returns {msg_id: details}; messages that failed to fetch are left out.
+        """
+        chunks = [msg_ids[i:i + BATCH_SIZE] for i in range(0, len(msg_ids), BATCH_SIZE)]
+
+        results = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=min(BATCH_WORKERS, len(chunks) or 1)) as ex:
+            for chunk_results, chunk_failed in ex.map(self._fetch_one_batch, chunks):
+                results.update(chunk_results)
+                failed.extend(chunk_failed)
+
+        # items the batch rejected (usually per-user rate limits) get one more
+        # try as individual, concurrent requests
+        if failed:
+            print(f"[INFO] Retrying {len(failed)} message(s) outside the batch...")
+            results.update(self.get_details_parallel(failed))
 
-        raw_msg = base64.urlsafe_b64decode(msg["raw"])
-        email_msg = message_from_bytes(raw_msg)
+        return results
 
-        sender_name, sender_email = parseaddr(email_msg.get("From", ""))
-        subject = email_msg.get("Subject", "")
-        date_raw = email_msg.get("Date", "")
+    @staticmethod
+    def _header_map(headers):
+        """Gmail header list → {lowercased name: first value}."""
+        out = {}
+        for h in headers or []:
+            out.setdefault(h.get("name", "").lower(), h.get("value", ""))
+        return out
+
+    @staticmethod
+    def _decode_part_body(part, part_headers):
+        data = part.get("body", {}).get("data")
+        if not data:
+            return ""
+        payload = pybase64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+        match = _CHARSET_RE.search(part_headers.get("content-type", ""))
+        charset = match.group(1) if match else "utf-8"
+        text, _ = _decoder_for(charset)(payload, "ignore")
+        return text
+
+    def _collect_text_parts(self, part, plain, html):
+        """
+        Walk Gmail's pre-parsed MIME tree, appending (part, headers) for every
+        text/plain and text/html leaf. Decoding is left to the caller.
+        """
+        if part.get("parts"):
+            for child in part["parts"]:
+                self._collect_text_parts(child, plain, html)
+            return
+
+        part_headers = self._header_map(part.get("headers"))
+        dispo = part_headers.get("content-disposition", "")
+        # attachments come back as an attachmentId without inline data
+        if "attachment" in dispo or part.get("body", {}).get("attachmentId"):
+            return
+
+        ctype = part.get("mimeType", "")
+        if ctype == "text/plain":
+            plain.append((part, part_headers))
+        elif ctype == "text/html":
+            html.append((part, part_headers))
+
+    def parse_message(self, msg):
+        msg_id = msg["id"]
+        payload = msg.get("payload", {})
+        headers = self._header_map(payload.get("headers"))
+
+        sender_name, sender_email = _parse_sender(headers.get("from", ""))
+        subject = headers.get("subject", "")
+        date_raw = headers.get("date", "")
 
 
         date_str = date_raw
@@ -139,33 +420,16 @@ class GmailLiveReader:
         except Exception:
             pass
 
-        plain, html = "", ""
-
-        if email_msg.is_multipart():
-            for part in email_msg.walk():
-                ctype = part.get_content_type()
-                dispo = str(part.get("Content-Disposition") or "")
-                charset = part.get_content_charset() or "utf-8"
-                payload = part.get_payload(decode=True)
-
-                if not payload:
-                    continue
+        plain_parts, html_parts = [], []
+        self._collect_text_parts(payload, plain_parts, html_parts)
+        plain = "".join(self._decode_part_body(p, h) for p, h in plain_parts)
 
-                if ctype == "text/plain" and "attachment" not in dispo:
-                    plain += payload.decode(charset, errors="ignore")
-                elif ctype == "text/html" and "attachment" not in dispo:
-                    html += payload.decode(charset, errors="ignore")
+        # the HTML alternative is only decoded and parsed when there is no usable plain text
+        if plain.strip():
+            body = plain
         else:
-            ctype = email_msg.get_content_type()
-            charset = email_msg.get_content_charset() or "utf-8"
-            payload = email_msg.get_payload(decode=True)
-            if payload:
-                if ctype == "text/plain":
-                    plain = payload.decode(charset, errors="ignore")
-                else:
-                    html = payload.decode(charset, errors="ignore")
-
-        body = plain if plain.strip() else self.html_to_text(html)
+            html = "".join(self._decode_part_body(p, h) for p, h in html_parts)
+            body = self.html_to_text(html)
 
 
         return {
@@ -178,14 +442,28 @@ class GmailLiveReader:
             "gmail_link": clean_for_excel(f"{self.gmail_web_base}{msg_id}"),
         }
 
-    def fetch_new_as_dataframe(self, query, seen_ids):
+    def fetch_new_as_dataframe(self, query, seen_ids, stop_at_seen=False):
         """
         - query: Gmail search string
         - seen_ids: set of already-processed message IDs (mutated in place)
+        - stop_at_seen: stop listing at the first page with a seen ID; only
+          safe when polling the same query repeatedly (see list_ids). Applied
+          from the second poll of a query on; failed messages are tracked and
+          re-requested regardless.
         Returns a DataFrame with ONLY new emails (ids not in seen_ids).
         """
-        all_ids = self.list_ids(query)
-        new_ids = [mid for mid in all_ids if mid not in seen_ids]
+        # the first poll of a query lists every page, so mail that failed in
+        # an earlier run (and is now past the first page) is still found
+        stop_at = seen_ids if stop_at_seen and query in self._fully_listed else None
+        all_ids = self.list_ids(query, stop_at=stop_at)
+        if stop_at is None:
+            self._fully_listed.add(query)
+
+        # deduped, order kept: a message can show up on two pages when new mail
+        # shifts the pagination, and a batch rejects a repeated request_id
+        new_ids = list(dict.fromkeys(
+            mid for mid in (*all_ids, *self._failed_ids) if mid not in seen_ids
+        ))
 
         if not new_ids:
             return pd.DataFrame(columns=[
@@ -193,44 +471,57 @@ class GmailLiveReader:
                 "subject", "body", "date_received", "gmail_link"
             ])
 
+        details = self.get_details_batch(new_ids)
+
         rows = []
         for mid in new_ids:
-            details = self.get_details(mid)
-            rows.append(details)
-            seen_ids.add(mid)
-
-        df = pd.DataFrame(rows)
+            if mid in details:
+                rows.append(details[mid])
+                seen_ids.add(mid)
+                self._failed_ids.pop(mid, None)
+                continue
+            # failed fetches stay out of seen_ids and are re-requested next poll
+            attempts = self._failed_ids.get(mid, 0) + 1
+            if attempts >= FETCH_MAX_ATTEMPTS:
+                print(f"[WARN] Giving up on message {mid} after {attempts} failed fetches.")
+                self._failed_ids.pop(mid, None)
+            else:
+                self._failed_ids[mid] = attempts
 
-        for col in df.select_dtypes(include=["object"]).columns:
-            df[col] = df[col].map(clean_for_excel)
+        df = pd.DataFrame(rows, columns=[
+            "id", "sender_name", "sender_email",
+            "subject", "body", "date_received", "gmail_link"
+        ])
 
+        # every field was already passed through clean_for_excel in parse_message
         return df
 
 
 
 if __name__ == "__main__":
+    # `python gmail_read.py --export-excel`: bring the xlsx up to date with the
+    # Parquet sidecar a running loop appends to, then exit
+    if "--export-excel" in sys.argv[1:]:
+        if export_excel(OUTPUT_EXCEL):
+            print(f"[EXPORT] Rewrote {OUTPUT_EXCEL} from its Parquet sidecar.")
+        else:
+            print(f"[EXPORT] {OUTPUT_EXCEL} is already up to date.")
+        sys.exit(0)
+
     reader = GmailLiveReader(
         credentials_path="credentials.json",
         token_path="token.json",
         gmail_account_index=0,
+        auto_refresh=True,
     )
 
-    
-    if os.path.exists(OUTPUT_EXCEL):
-        master_df = pd.read_excel(OUTPUT_EXCEL)
-        for col in master_df.select_dtypes(include=["object"]).columns:
-            master_df[col] = master_df[col].map(clean_for_excel)
-
-        if "id" in master_df.columns:
-            seen_ids = set(master_df["id"].astype(str).tolist())
-        else:
-            seen_ids = set()
-        print(f"[INIT] Loaded {len(master_df)} rows from {OUTPUT_EXCEL}")
+    # only the ids are needed to start polling; new mail is appended to the
+    # Parquet sidecar, so the full master is never held in memory
+    have_export = os.path.exists(OUTPUT_EXCEL) or os.path.exists(parquet_sidecar(OUTPUT_EXCEL))
+    if have_export:
+        seen_ids = read_export_ids(OUTPUT_EXCEL)
+        print(f"[INIT] Loaded {len(seen_ids)} known ids from {OUTPUT_EXCEL}")
     else:
-        master_df = pd.DataFrame(columns=[
-            "id", "sender_name", "sender_email",
-            "subject", "body", "date_received", "gmail_link"
-        ])
         seen_ids = set()
         print(f"[INIT] No existing Excel found. Will create {OUTPUT_EXCEL}")
 
@@ -238,26 +529,38 @@ if __name__ == "__main__":
     print(f"Query: {QUERY}")
     print(f"Interval: {INTERVAL} seconds")
     print(f"Output Excel: {OUTPUT_EXCEL}")
+    print("The Excel file is rewritten on exit (or with --export-excel).")
     print("Press Ctrl+C to stop.\n")
 
-    while True:
-        loop_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        df_new = reader.fetch_new_as_dataframe(QUERY, seen_ids)
-
-        if df_new.empty:
-            print(f"[{loop_time}] No new emails.")
-        else:
-            master_df = pd.concat([master_df, df_new], ignore_index=True)
-
-            for col in master_df.select_dtypes(include=["object"]).columns:
-                master_df[col] = master_df[col].map(clean_for_excel)
-
-            master_df.to_excel(OUTPUT_EXCEL, index=False)
+    try:
+        while True:
+            loop_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            print(f"[{loop_time}] {len(df_new)} new email(s) appended to {OUTPUT_EXCEL}")
-            print(df_new[["date_received", "sender_email", "subject"]])
-            print()
+            df_new = reader.fetch_new_as_dataframe(QUERY, seen_ids, stop_at_seen=True)
 
-        print("-" * 80)
-        time.sleep(INTERVAL)
+            if df_new.empty:
+                print(f"[{loop_time}] No new emails.")
+            else:
+                # df_new is already cleaned by fetch_new_as_dataframe
+                if not append_export(df_new, OUTPUT_EXCEL):
+                    # no current sidecar to append to (first run, or an older
+                    # single-file one): one full write starts the part files
+                    if have_export:
+                        master_df = clean_frame_for_excel(read_export(OUTPUT_EXCEL))
+                    else:
+                        master_df = pd.DataFrame(columns=df_new.columns)
+                    write_export(pd.concat([master_df, df_new], ignore_index=True), OUTPUT_EXCEL)
+                    del master_df
+                    have_export = True
+
+                print(f"[{loop_time}] {len(df_new)} new email(s) appended to {parquet_sidecar(OUTPUT_EXCEL)}")
+                print(df_new[["date_received", "sender_email", "subject"]])
+                print()
+
+            print("-" * 80)
+            time.sleep(INTERVAL)
+    except KeyboardInterrupt:
+        print("\nStopping.")
+    finally:
+        if export_excel(OUTPUT_EXCEL):
+            print(f"[EXPORT] Rewrote {OUTPUT_EXCEL} from its Parquet sidecar.")
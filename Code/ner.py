@@ -1,12 +1,34 @@
 import os
 import json
 import re
+import threading
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
 MODEL_NAME = "llama3.1"
 
+# emails processed concurrently; Ollama queues what it can't run in parallel
+# (see OLLAMA_NUM_PARALLEL), so this mostly overlaps HTTP and parsing
+LLM_WORKERS = 4
+
+# bodies at most this long go to extraction as-is: a summary wouldn't be any
+# shorter, and it costs a full LLM generation per email
+SUMMARY_MIN_CHARS = 1500
+
+# keep-alive connection pool per thread: requests.Session is not documented
+# as thread-safe, and call_ollama runs on LLM_WORKERS pool threads
+_local = threading.local()
+
+
+def _http_session():
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
 SYSTEM_PROMPT = """
 You are an assistant that extracts structured job application information from email text.
 
@@ -90,8 +112,34 @@ Rules:
 - Do NOT output JSON or bullet points. Just a single, clean paragraph of text.
 """
 
-def matches_any(patterns, text: str) -> bool:
-    return any(re.search(p, text, flags=re.IGNORECASE) for p in patterns)
+def compile_any(patterns) -> re.Pattern:
+    """Merge a pattern list into one case-insensitive alternation."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), flags=re.IGNORECASE)
+
+# a title ends at the first "position"/"role"/"job"/"at"/"with"; one scan instead of three
+TITLE_CUT_RE = re.compile(r"\b(?:position|role|job|at|with)\b", flags=re.IGNORECASE)
+LEADING_THE_RE = re.compile(r"^(the)\s+", flags=re.IGNORECASE)
+TRAILING_NOISE_RE = re.compile(
+    r"\b(?:position is|is currently under review)\b.*$", flags=re.IGNORECASE
+)
+GENERIC_TITLE_RE = re.compile(r"(the|this|that|a|an)?\s*(position|role|job)", flags=re.IGNORECASE)
+
+# tried in order; the first pattern that matches anywhere wins, so these stay
+# separate compiled patterns rather than one leftmost-match alternation
+TITLE_PATTERNS = [
+    re.compile(p, flags=re.IGNORECASE)
+    for p in [
+        r"application for\s+(?P<title>[^,\n]+)",
+        r"applied for the position of\s+(?P<title>[^,\n]+)",
+        r"applied for\s+(?P<title>[^,\n]+)",
+        r"for the position of\s+(?P<title>[^,\n]+)",
+        r"position:\s*(?P<title>[^,\n]+)",
+        r"role:\s*(?P<title>[^,\n]+)",
+        r"job title:\s*(?P<title>[^,\n]+)",
+        r"position applied:\s*(?P<title>[^,\n]+)",
+    ]
+]
+REF_TITLE_RE = re.compile(r"ref:\s*\S+\s*[-–]\s*(?P<title>[^,\n]+)", flags=re.IGNORECASE)
 
 def heuristic_position(subject: str, body: str) -> str:
     subject = subject or ""
@@ -101,36 +149,19 @@ def heuristic_position(subject: str, body: str) -> str:
     def _clean_title(t: str) -> str:
         t = t.strip(" .|,-–—:;")
         t = t.replace("*", "").replace('"', "").replace("'", "")
-        t = re.sub(r"\b(position|role|job)\b.*$", "", t, flags=re.IGNORECASE)
-        t = re.split(r"\bat\b", t, flags=re.IGNORECASE)[0]
-        t = re.split(r"\bwith\b", t, flags=re.IGNORECASE)[0]
-        t = re.sub(r"^(the)\s+", "", t, flags=re.IGNORECASE)
+        t = TITLE_CUT_RE.split(t, maxsplit=1)[0]
+        t = LEADING_THE_RE.sub("", t)
         t = " ".join(t.split())
         return t.strip()
 
-    patterns = [
-        r"application for\s+(?P<title>[^,\n]+)",
-        r"applied for the position of\s+(?P<title>[^,\n]+)",
-        r"applied for\s+(?P<title>[^,\n]+)",
-        r"for the position of\s+(?P<title>[^,\n]+)",
-        r"position:\s*(?P<title>[^,\n]+)",
-        r"role:\s*(?P<title>[^,\n]+)",
-        r"job title:\s*(?P<title>[^,\n]+)",
-        r"position applied:\s*(?P<title>[^,\n]+)",
-    ]
-
-    for pat in patterns:
-        m = re.search(pat, text_all, flags=re.IGNORECASE)
+    for pat in TITLE_PATTERNS:
+        m = pat.search(text_all)
         if m:
             title = _clean_title(m.group("title"))
             if title and 1 <= len(title.split()) <= 20:
                 return title
 
-    ref_match = re.search(
-        r"ref:\s*\S+\s*[-–]\s*(?P<title>[^,\n]+)",
-        text_all,
-        flags=re.IGNORECASE,
-    )
+    ref_match = REF_TITLE_RE.search(text_all)
     if ref_match:
         title = _clean_title(ref_match.group("title"))
         if title and 1 <= len(title.split()) <= 20:
@@ -166,82 +197,86 @@ def clean_final_position(title: str) -> str:
         return ""
 
     t = title.strip()
-    t = re.sub(r"\bposition is\b.*$", "", t, flags=re.IGNORECASE)
-    t = re.sub(r"\bis currently under review\b.*$", "", t, flags=re.IGNORECASE)
+    t = TRAILING_NOISE_RE.sub("", t)
     t = t.strip(" .|,-–—")
 
-    if re.fullmatch(r"(the|this|that|a|an)?\s*(position|role|job)", t, flags=re.IGNORECASE):
+    if GENERIC_TITLE_RE.fullmatch(t):
         return ""
 
-    t = re.sub(r"^(the)\s+", "", t, flags=re.IGNORECASE).strip()
+    t = LEADING_THE_RE.sub("", t).strip()
     return t
 
+OFFER_PATTERNS = [
+    r"\bjob offer\b",
+    r"\boffer of employment\b",
+    r"\bwe are pleased to offer you\b",
+    r"\bwe are excited to offer\b",
+    r"\boffer letter\b",
+]
+
+REJECT_PATTERNS = [
+    r"\bwe regret to inform you\b",
+    r"\bnot be moving forward with your application\b",
+    r"\bwe will not be moving forward\b",
+    r"\bnot moving forward with your application\b",
+    r"\bapplication was not successful\b",
+    r"\bhas been unsuccessful\b",
+    r"\bunfortunately[, ]+we\b.*\bnot\b.*\bmove forward\b",
+    r"\bno further action will be taken on your online submission\b",
+]
+
+IN_PROGRESS_PATTERNS = [
+    r"\byou are still in consideration\b",
+    r"\bstill in consideration\b",
+    r"\bstill considered\b",
+    r"\bunder review\b",
+    r"\bcurrently under review\b",
+    r"\bwe are reviewing your application\b",
+    r"\bwe will provide an update\b",
+    r"\bwe will contact you\b.*\bnext steps\b",
+    r"\bnext steps\b",
+    r"\bassessment\b",
+    r"\bcoding assessment\b",
+    r"\bon-demand assessments\b",
+    r"\bassessment centre\b",
+    r"\bvideo interview\b",
+    r"\bpre[- ]?recorded video interview\b",
+    r"\bprvi\b",
+    r"\binvited to complete\b.*(assessment|interview)",
+    r"\binvited to take\b.*(assessment|interview)",
+    r"\bselected to complete\b.*(assessment|interview)",
+    r"\bselected to apply\b",
+]
+
+APPLIED_PATTERNS = [
+    r"\bapplication has been submitted\b",
+    r"\byour application has been submitted\b",
+    r"\bhas been submitted successfully\b",
+    r"\bwe received your application\b",
+    r"\bwe have received your application\b",
+    r"\bthank you for applying\b",
+    r"\bthanks for applying\b",
+    r"\bthank you for your application\b",
+    r"\bapplication received\b",
+    r"\byour submission will be reviewed\b",
+    r"\bapplication is currently being reviewed\b",
+]
+
+# (status, compiled alternation) in priority order; each list is a single regex scan
+STATUS_RULES = [
+    ("job offered", compile_any(OFFER_PATTERNS)),
+    ("rejected", compile_any(REJECT_PATTERNS)),
+    ("in progress", compile_any(IN_PROGRESS_PATTERNS)),
+    ("applied", compile_any(APPLIED_PATTERNS)),
+]
+
+
 def infer_status(full_text: str, llm_status: str) -> str:
     text = full_text.lower()
 
-    offer_patterns = [
-        r"\bjob offer\b",
-        r"\boffer of employment\b",
-        r"\bwe are pleased to offer you\b",
-        r"\bwe are excited to offer\b",
-        r"\boffer letter\b",
-    ]
-    if matches_any(offer_patterns, text):
-        return "job offered"
-
-    reject_patterns = [
-        r"\bwe regret to inform you\b",
-        r"\bnot be moving forward with your application\b",
-        r"\bwe will not be moving forward\b",
-        r"\bnot moving forward with your application\b",
-        r"\bapplication was not successful\b",
-        r"\bhas been unsuccessful\b",
-        r"\bunfortunately[, ]+we\b.*\bnot\b.*\bmove forward\b",
-        r"\bno further action will be taken on your online submission\b",
-    ]
-    if matches_any(reject_patterns, text):
-        return "rejected"
-
-    in_progress_patterns = [
-        r"\byou are still in consideration\b",
-        r"\bstill in consideration\b",
-        r"\bstill considered\b",
-        r"\bunder review\b",
-        r"\bcurrently under review\b",
-        r"\bwe are reviewing your application\b",
-        r"\bwe will provide an update\b",
-        r"\bwe will contact you\b.*\bnext steps\b",
-        r"\bnext steps\b",
-        r"\bassessment\b",
-        r"\bcoding assessment\b",
-        r"\bon-demand assessments\b",
-        r"\bassessment centre\b",
-        r"\bvideo interview\b",
-        r"\bpre[- ]?recorded video interview\b",
-        r"\bprvi\b",
-        r"\binvited to complete\b.*(assessment|interview)",
-        r"\binvited to take\b.*(assessment|interview)",
-        r"\bselected to complete\b.*(assessment|interview)",
-        r"\bselected to apply\b",
-    ]
-    if matches_any(in_progress_patterns, text):
-        return "in progress"
-
-    applied_patterns = [
-        r"\bapplication has been submitted\b",
-        r"\byour application has been submitted\b",
-        r"\bhas been submitted successfully\b",
-        r"\bwe received your application\b",
-        r"\bwe have received your application\b",
-        r"\bthank you for applying\b",
-        r"\bthanks for applying\b",
-        r"\bthank you for your application\b",
-        r"\bapplication received\b",
-        r"\byour submission will be reviewed\b",
-        r"\bapplication is currently being reviewed\b",
-    ]
-    if matches_any(applied_patterns, text):
-        return "applied"
+    for status, pattern in STATUS_RULES:
+        if pattern.search(text):
+            return status
 
     if llm_status in {"applied", "in progress", "rejected", "job offered"}:
         return llm_status
@@ -256,7 +291,7 @@ def call_ollama(prompt: str, model: str = MODEL_NAME, url: str = OLLAMA_URL) ->
         "options": {"temperature": 0.0},
     }
     try:
-        resp = requests.post(url, json=payload, timeout=60)
+        resp = _http_session().post(url, json=payload, timeout=60)
         resp.raise_for_status()
         data = resp.json()
         return data.get("response", "").strip()
@@ -282,6 +317,8 @@ def extract_json_object(text: str) -> str:
 def summarize_email(subject: str, body: str) -> str:
     subject = subject or ""
     body = body or ""
+    if len(body) <= SUMMARY_MIN_CHARS:
+        return body.strip()
     body_short = body[:8000]
 
     user_prompt = f"""
@@ -377,6 +414,42 @@ def derive_application_date(date_received: str) -> str:
     return d.strftime("%Y-%m-%d")
 
 
+def parse_job_email(row: dict) -> dict:
+    """Summary + LLM extraction + rule post-processing for one job email."""
+    subject = row["subject"]
+    body_full = row["full_text"] or row["body"]
+    date_received = row["date_received"]
+
+    full_original = (subject or "") + "\n" + (body_full or "")
+
+    # Summary for mailcontent
+    mailcontent = summarize_email(subject, body_full)
+
+    # Heuristic position
+    position_h = heuristic_position(subject, body_full)
+
+    # LLM extraction
+    info = call_llm_extract(subject, mailcontent, date_received)
+
+    # Combine heuristic + LLM position
+    raw_position = position_h if position_h else info["position_applied"]
+    final_position = clean_final_position(raw_position)
+
+    # Application date from received date
+    app_date = derive_application_date(date_received)
+
+    # Final status via rules + llm
+    final_status = infer_status(full_original, info["status"])
+
+    return {
+        "mailcontent": full_original,
+        "company_name": info["company_name"],
+        "position_applied": final_position,
+        "application_date": app_date,
+        "status": final_status,
+    }
+
+
 class LocalLLMJobParser:
     def __init__(self, input_filename: str, output_filename: str):
         code_dir = os.getcwd()
@@ -455,47 +528,21 @@ class LocalLLMJobParser:
         # ----------------------------------------
         # 4) Run LLM parsing ONLY on new emails
         # ----------------------------------------
-        mailcontents = []
-        company_names = []
-        positions = []
-        app_dates = []
-        statuses = []
         mail_links = df_new["gmail_link"].tolist()
-
-        for i, (_, row) in enumerate(df_new.iterrows(), start=1):
-            subject = row["subject"]
-            body_full = row["full_text"] or row["body"]
-            date_received = row["date_received"]
-
-            full_original = (subject or "") + "\n" + (body_full or "")
-
-            # Summary for mailcontent
-            mailcontent = summarize_email(subject, body_full)
-            mailcontents.append(full_original)
-
-            # Heuristic position
-            position_h = heuristic_position(subject, body_full)
-
-            # LLM extraction
-            info = call_llm_extract(subject, mailcontent, date_received)
-
-            # Combine heuristic + LLM position
-            raw_position = position_h if position_h else info["position_applied"]
-            final_position = clean_final_position(raw_position)
-
-            # Application date from received date
-            app_date = derive_application_date(date_received)
-
-            # Final status via rules + llm
-            final_status = infer_status(full_original, info["status"])
-
-            company_names.append(info["company_name"])
-            positions.append(final_position)
-            app_dates.append(app_date)
-            statuses.append(final_status)
-
-            if i % 10 == 0:
-                print(f"Processed {i} new job emails...")
+        rows = df_new[["subject", "full_text", "body", "date_received"]].to_dict(orient="records")
+
+        with ThreadPoolExecutor(max_workers=LLM_WORKERS) as ex:
+            results = []
+            for i, result in enumerate(ex.map(parse_job_email, rows), start=1):
+                results.append(result)
+                if i % 10 == 0:
+                    print(f"Processed {i} new job emails...")
+
+        mailcontents = [r["mailcontent"] for r in results]
+        company_names = [r["company_name"] for r in results]
+        positions = [r["position_applied"] for r in results]
+        app_dates = [r["application_date"] for r in results]
+        statuses = [r["status"] for r in results]
 
         result_new_df = pd.DataFrame({
             "mailcontent": mailcontents,
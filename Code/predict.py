@@ -1,7 +1,22 @@
 import os
 import sys
 import joblib
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+
+from table_io import read_export, write_excel_streaming
+
+# below this many new rows, worker start-up costs more than it saves
+PARALLEL_MIN_ROWS = 5000
+
+
+def _score_chunk(model, texts):
+    # one pipeline pass: predict() would re-run the TF-IDF transform just to
+    # take the argmax of the same probabilities (ties go to classes_[0] there too)
+    probs = model.predict_proba(texts)[:, 1]
+    preds = model.classes_[(probs > 0.5).astype(int)]
+    return preds, probs
 
 
 class EmailJobClassifier:
@@ -24,10 +39,11 @@ class EmailJobClassifier:
 
 
     @staticmethod
-    def load_excel_safely(path: str):
+    def load_excel_safely(path: str, usecols=None):
         try:
+            # prefers the Parquet copy gmail_read.py writes next to its export
             print(f"[INFO] Loading Excel from: {path}")
-            return pd.read_excel(path)
+            return read_export(path, usecols=usecols)
         except Exception as e:
             print(f"[ERROR] Unable to read Excel file: {e}")
             sys.exit(1)
@@ -36,11 +52,27 @@ class EmailJobClassifier:
     def load_model_safely(path: str):
         try:
             print(f"[INFO] Loading model from: {path}")
-            return joblib.load(path)
+            return joblib.load(path, mmap_mode="r")
         except Exception as e:
             print(f"[ERROR] Unable to load model: {e}")
             sys.exit(1)
 
+    def predict_new(self, texts: pd.Series):
+        """(labels, prob column 1) for the given texts."""
+        model = self.load_model_safely(self.model_path)
+        if len(texts) < PARALLEL_MIN_ROWS:
+            return _score_chunk(model, texts)
+
+        # the TF-IDF transform is single-threaded: score one slice per core
+        n_jobs = os.cpu_count() or 1
+        chunks = np.array_split(texts.to_numpy(dtype=object), n_jobs)
+        results = Parallel(n_jobs=n_jobs, backend="loky")(
+            delayed(_score_chunk)(model, chunk) for chunk in chunks if len(chunk)
+        )
+        preds = np.concatenate([p for p, _ in results])
+        probs = np.concatenate([q for _, q in results])
+        return preds, probs
+
 
     def classify(self):
         # Check files
@@ -74,7 +106,11 @@ class EmailJobClassifier:
 
        
         if os.path.exists(self.output_path):
-            df_old = self.load_excel_safely(self.output_path)
+            # only the id -> prediction mapping is reused; skip the text columns
+            df_old = self.load_excel_safely(
+                self.output_path,
+                usecols=lambda c: c in {"id", "job_label", "prob_job"},
+            )
 
             # Make sure id is string for matching
             if use_id and "id" in df_old.columns:
@@ -87,7 +123,8 @@ class EmailJobClassifier:
             print(f"[INFO] No existing classified file found. Will create a new one.")
 
         
-        df = df_src.copy()
+        # df_src is private to this call: add the prediction columns in place
+        df = df_src
 
         
         if "job_label" not in df.columns:
@@ -102,28 +139,12 @@ class EmailJobClassifier:
             cols_to_pull = [c for c in cols_to_pull if c in df_old.columns]
 
             df_old_small = df_old[cols_to_pull].drop_duplicates(subset=["id"])
+            df_old_small = df_old_small.set_index("id")
 
-            
-            df = df.merge(
-                df_old_small,
-                on="id",
-                how="left",
-                suffixes=("", "_old"),
-            )
-
-            
-            if "job_label_old" in df.columns:
-                df["job_label"] = df["job_label"].fillna(df["job_label_old"])
-                df.drop(columns=["job_label_old"], inplace=True)
-
-            if "prob_job_old" in df.columns:
-                df["prob_job"] = df["prob_job"].fillna(df["prob_job_old"])
-                df.drop(columns=["prob_job_old"], inplace=True)
-
-        
-        df["subject"] = df["subject"].fillna("")
-        df["body"] = df["body"].fillna("")
-        df["text"] = df["subject"] + " " + df["body"]
+            # id -> previous prediction lookups; no merged copy of the frame
+            for col in ("job_label", "prob_job"):
+                if col in df_old_small.columns:
+                    df[col] = df[col].fillna(df["id"].map(df_old_small[col]))
 
         
         mask_new = df["job_label"].isna()
@@ -135,25 +156,33 @@ class EmailJobClassifier:
         if num_to_classify == 0:
             print("[INFO] Nothing new to classify. Exiting.")
             # Still save df (in case structure changed)
-            df.to_excel(self.output_path, index=False)
+            write_excel_streaming(df, self.output_path)
             print(f"[INFO] Updated file saved to: {self.output_path}")
             return df
 
        
-        model = self.load_model_safely(self.model_path)
-
         print("[INFO] Running predictions on NEW rows only...")
-        texts_new = df.loc[mask_new, "text"]
+        # model input is built for the new rows only (nothing reads it back from the file)
+        texts_new = (
+            df.loc[mask_new, "subject"].fillna("").astype(str)
+            + " "
+            + df.loc[mask_new, "body"].fillna("").astype(str)
+        )
 
-        preds = model.predict(texts_new)
-        probs = model.predict_proba(texts_new)[:, 1]
+        preds, probs = self.predict_new(texts_new)
 
        
-        df.loc[mask_new, "job_label"] = preds
-        df.loc[mask_new, "prob_job"] = probs
+        # scatter into plain arrays instead of two boolean .loc assignments
+        idx = np.flatnonzero(mask_new.to_numpy())
+        labels = df["job_label"].to_numpy(dtype=object, copy=True)
+        prob_values = df["prob_job"].to_numpy(dtype=float, na_value=np.nan, copy=True)
+        labels[idx] = preds
+        prob_values[idx] = probs
+        df["job_label"] = labels
+        df["prob_job"] = prob_values
 
        
-        df.to_excel(self.output_path, index=False)
+        write_excel_streaming(df, self.output_path)
 
         print(f"[INFO] Incremental classification complete.")
         print(f"[INFO] Saved updated classifications to: {self.output_path}")
@@ -1,17 +1,24 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import TypedDict, List, Any, Optional
 
+import numpy as np
 import pandas as pd
+import torch
 import chromadb
 from sentence_transformers import SentenceTransformer
 
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import Chroma
 from langchain_community.llms import Ollama
 from langchain_core.prompts import PromptTemplate
 from langgraph.graph import StateGraph, END
 
 
+from table_io import read_export
+
+
 # Path Setup
 
 code_dir = os.path.dirname(os.path.abspath(__file__))   
@@ -38,6 +45,19 @@ class RAGState(TypedDict):
 _rag_app = None      
 _retriever = None    
 _df_parsed: Optional[pd.DataFrame] = None  
+_company_keys: List[Any] = []   # (company_name, lowercased) pairs, built with _df_parsed
+_df_source: Optional[pd.DataFrame] = None   # parsed file as read, for the vector store
+_embedder = None
+
+EMBED_MODEL_NAME = "BAAI/bge-large-en-v1.5"
+EMBED_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+EMBED_BATCH_SIZE = 64
+# CPU-only: shard encoding across worker processes above this many new rows.
+# Every worker holds its own copy of BGE-large (~1.3 GB), so the count is capped,
+# and the cores are split between workers instead of each using all of them.
+MULTI_PROCESS_MIN_DOCS = 512
+EMBED_CPU_WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+EMBED_THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // EMBED_CPU_WORKERS)
 
 # Prompt Template
 
@@ -95,8 +115,6 @@ def _maybe_answer_with_analytics(question: str) -> Optional[str]:
         - A natural language answer if we detect an aggregate/stats question.
         - None otherwise (so we fall back to normal RAG).
     """
-    global _df_parsed
-
     if _df_parsed is None:
         return None
 
@@ -129,22 +147,13 @@ def _maybe_answer_with_analytics(question: str) -> Optional[str]:
     if not any(t in q_lower for t in trigger_words):
         return None
 
-    df = _df_parsed.copy()
-
-    # Normalize key columns
-    df["company_name"] = df["company_name"].fillna("").astype(str).str.strip()
-    df["position_applied"] = df["position_applied"].fillna("").astype(str).str.strip()
-    df["status"] = df["status"].fillna("").astype(str).str.lower().str.strip()
-
-    companies = sorted(
-        c for c in df["company_name"].unique() if isinstance(c, str) and c.strip()
-    )
+    # key columns were normalized once in _set_parsed_df
+    df = _df_parsed
 
     matched_companies = []
     q_lower_spaced = f" {q_lower} "
-    for c in companies:
-        c_lower = c.lower()
-        if c_lower and c_lower in q_lower_spaced:
+    for c, c_lower in _company_keys:
+        if c_lower in q_lower_spaced:
             matched_companies.append(c)
 
     if matched_companies:
@@ -214,20 +223,33 @@ def _maybe_answer_with_analytics(question: str) -> Optional[str]:
 
 
 
-def _init_rag_app():
+def _set_parsed_df(df: pd.DataFrame):
     """
-    Lazy initializer:
-    - Loads mail_classified_llm_parsed.xlsx into _df_parsed
-    - Incrementally updates Chroma (only new docs based on mail_link/doc_id)
-    - Builds LangGraph pipeline
-
-    Sets global _rag_app, _retriever, and _df_parsed.
+    Store the parsed emails for analytics with the key columns normalized
+    (stripped, status lowercased) and the company names lowercased once,
+    instead of redoing it on every question.
     """
-    global _rag_app, _retriever, _df_parsed
+    global _df_parsed, _company_keys
 
+    df = df.copy()
+    df["company_name"] = df["company_name"].fillna("").astype(str).str.strip()
+    df["position_applied"] = df["position_applied"].fillna("").astype(str).str.strip()
+    df["status"] = df["status"].fillna("").astype(str).str.lower().str.strip()
 
-    if _rag_app is not None:
-        return
+    companies = sorted(c for c in df["company_name"].unique() if c)
+    _company_keys = [(c, c.lower()) for c in companies]
+    _df_parsed = df
+
+
+def _load_parsed_df() -> pd.DataFrame:
+    """
+    Read mail_classified_llm_parsed.xlsx once. This is all the analytics path
+    needs, so stats questions never pay for the vector store / LLM setup.
+    """
+    global _df_source
+
+    if _df_source is not None:
+        return _df_source
 
     if not os.path.exists(EXCEL_PATH):
         raise FileNotFoundError(
@@ -236,7 +258,7 @@ def _init_rag_app():
         )
 
     print(f">>> Loading parsed job emails from: {EXCEL_PATH}")
-    df = pd.read_excel(EXCEL_PATH)
+    df = read_export(EXCEL_PATH)
 
     required_cols = [
         "mailcontent",
@@ -250,7 +272,91 @@ def _init_rag_app():
         if col not in df.columns:
             raise ValueError(f"Missing required column: {col}")
 
-    _df_parsed = df.copy()
+    _set_parsed_df(df)
+    _df_source = df
+    return df
+
+
+def _get_embedder() -> SentenceTransformer:
+    """Load BGE once; fp16 on GPU (embeddings are compared by cosine, so precision is ample)."""
+    global _embedder
+
+    if _embedder is None:
+        print(f"\n>>> Loading embedding model ({EMBED_MODEL_NAME}) on {EMBED_DEVICE}...")
+        _embedder = SentenceTransformer(EMBED_MODEL_NAME, device=EMBED_DEVICE)
+        if EMBED_DEVICE == "cuda":
+            _embedder.half()
+    return _embedder
+
+
+def _init_embed_worker(n_threads: int):
+    # runs once in each spawned worker, before its model is loaded
+    torch.set_num_threads(n_threads)
+    _get_embedder()
+
+
+def _encode_in_worker(texts: List[str]):
+    return _get_embedder().encode(
+        texts,
+        batch_size=EMBED_BATCH_SIZE,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+    )
+
+
+def _encode_multi_process(documents: List[str]):
+    """Encode on EMBED_CPU_WORKERS processes with EMBED_THREADS_PER_WORKER torch threads each."""
+    n = EMBED_CPU_WORKERS
+    size = -(-len(documents) // n)
+    chunks = [documents[i:i + size] for i in range(0, len(documents), size)]
+
+    print(f">>> Encoding on {n} worker processes x {EMBED_THREADS_PER_WORKER} threads...")
+    with ProcessPoolExecutor(
+        max_workers=n,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_embed_worker,
+        initargs=(EMBED_THREADS_PER_WORKER,),
+    ) as ex:
+        parts = list(ex.map(_encode_in_worker, chunks))
+    return np.concatenate(parts)
+
+
+class SharedSTEmbeddings(Embeddings):
+    """LangChain embeddings backed by the already-loaded SentenceTransformer."""
+
+    def __init__(self, model: SentenceTransformer):
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(
+            texts,
+            batch_size=EMBED_BATCH_SIZE,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        ).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _init_rag_app():
+    """
+    Lazy initializer:
+    - Loads mail_classified_llm_parsed.xlsx (via _load_parsed_df)
+    - Incrementally updates Chroma (only new docs based on mail_link/doc_id)
+    - Builds LangGraph pipeline
+
+    Sets global _rag_app and _retriever.
+    """
+    global _rag_app, _retriever
+
+
+    if _rag_app is not None:
+        return
+
+    df = _load_parsed_df().copy()
 
     df["mail_link"] = df["mail_link"].fillna("").astype(str)
     df["doc_id"] = df["mail_link"]
@@ -269,8 +375,17 @@ def _init_rag_app():
     )
 
 
-    existing = collection.get(limit=1_000_000)   
-    existing_ids = set(existing.get("ids", []))
+    # ids only (no documents/embeddings), paged so the whole index is never hydrated
+    existing_ids = set()
+    page_size = 10_000
+    offset = 0
+    while True:
+        page = collection.get(include=[], limit=page_size, offset=offset)
+        page_ids = page.get("ids", [])
+        existing_ids.update(page_ids)
+        if len(page_ids) < page_size:
+            break
+        offset += page_size
 
     print(f">>> Existing vectors in Chroma: {len(existing_ids)}")
 
@@ -287,11 +402,23 @@ def _init_rag_app():
             ["company_name", "position_applied", "application_date", "status", "mail_link"]
         ].astype(str).to_dict(orient="records")
 
-        print("\n>>> Loading embedding model (BAAI/bge-large-en-v1.5)...")
-        embedder = SentenceTransformer("BAAI/bge-large-en-v1.5")
+        embedder = _get_embedder()
 
         print(">>> Embedding email texts (new only)...")
-        embeddings = embedder.encode(documents, convert_to_numpy=True)
+        if (
+            EMBED_DEVICE == "cpu"
+            and EMBED_CPU_WORKERS > 1
+            and len(documents) >= MULTI_PROCESS_MIN_DOCS
+        ):
+            embeddings = _encode_multi_process(documents)
+        else:
+            embeddings = embedder.encode(
+                documents,
+                batch_size=EMBED_BATCH_SIZE,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
 
         print(">>> Storing new embeddings in Chroma...")
         collection.add(
@@ -305,7 +432,8 @@ def _init_rag_app():
 
 
 
-    lc_embedder = HuggingFaceEmbeddings(model_name="BAAI/bge-large-en-v1.5")
+    # same weights as the indexing pass above, not a second model load
+    lc_embedder = SharedSTEmbeddings(_get_embedder())
 
     vectorstore = Chroma(
         client=client,
@@ -390,10 +518,10 @@ def ask(question: str) -> str:
     """
     Public function used by Streamlit (app.py) and CLI.
 
-    - Lazily initializes the RAG pipeline on first call.
     - FIRST tries to answer aggregate/statistics questions using the FULL
       DataFrame (_df_parsed), so counts and totals are correct.
-    - Otherwise, falls back to RAG (retriever + LLM).
+    - Otherwise, falls back to RAG (retriever + LLM), lazily initializing
+      the pipeline on the first such question.
     """
     global _rag_app
 
@@ -401,13 +529,15 @@ def ask(question: str) -> str:
         return "Please provide a non-empty question."
 
 
-    if _rag_app is None:
-        _init_rag_app()
+    # stats questions only need the parsed table; skip Chroma/embeddings/LLM setup
+    _load_parsed_df()
 
     analytics_answer = _maybe_answer_with_analytics(question)
     if analytics_answer is not None:
         return analytics_answer
 
+    if _rag_app is None:
+        _init_rag_app()
 
     initial_state: RAGState = {
         "question": question,
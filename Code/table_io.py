@@ -0,0 +1,142 @@
+import glob
+import importlib.util
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+# Rust-backed xlsx reader when python-calamine is installed (pandas >= 2.2),
+# otherwise pandas' default openpyxl engine
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") is not None else None
+
+
+def parquet_sidecar(path):
+    """
+    Parquet copy of an export: a directory of part files (one per append_export
+    call). Exports written before parts existed are a single Parquet file.
+    """
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def _sidecar_parts(sidecar):
+    # zero-padded names, so sorted order is append order
+    return sorted(glob.glob(os.path.join(sidecar, "part-*.parquet")))
+
+
+def _remove_sidecar(sidecar):
+    if os.path.isdir(sidecar):
+        shutil.rmtree(sidecar)
+    elif os.path.exists(sidecar):
+        os.remove(sidecar)
+
+
+def _sidecar_is_current(path):
+    sidecar = parquet_sidecar(path)
+    return os.path.exists(sidecar) and (
+        not os.path.exists(path) or os.path.getmtime(sidecar) >= os.path.getmtime(path)
+    )
+
+
+def read_export(path, usecols=None):
+    """
+    Read an Excel export, preferring its Parquet sidecar when the sidecar is
+    at least as new (the Excel file is kept for the downstream scripts, but
+    Parquet is much cheaper to parse). usecols is a column-name predicate,
+    as for pd.read_excel.
+    """
+    if _sidecar_is_current(path):
+        sidecar = parquet_sidecar(path)
+        columns = None
+        if usecols is not None:
+            parts = _sidecar_parts(sidecar) if os.path.isdir(sidecar) else [sidecar]
+            columns = [c for c in pq.read_schema(parts[0]).names if usecols(c)]
+        return pd.read_parquet(sidecar, columns=columns)
+    return pd.read_excel(path, usecols=usecols, engine=EXCEL_ENGINE)
+
+
+def read_export_ids(path):
+    """Read just the id column of an export (set of str), without parsing the bodies."""
+    df = read_export(path, usecols=lambda c: c == "id")
+    if "id" not in df.columns:
+        return set()
+    return set(df["id"].astype(str).tolist())
+
+
+def write_excel_streaming(df, path):
+    """
+    Same sheet as df.to_excel(path, index=False), but rows are streamed
+    into a write-only workbook instead of building the whole sheet in memory.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Sheet1")
+    ws.append([str(c) for c in df.columns])
+
+    # NaN / NA -> empty cell, like to_excel
+    values = df.astype(object).where(df.notna(), None)
+    for row in values.itertuples(index=False, name=None):
+        ws.append(row)
+
+    wb.save(path)
+
+
+def write_export(df, path):
+    """Write the Excel export (read by predict.py) plus its Parquet sidecar."""
+    write_excel_streaming(df, path)
+    sidecar = parquet_sidecar(path)
+    try:
+        _remove_sidecar(sidecar)
+        os.makedirs(sidecar)
+        df.to_parquet(os.path.join(sidecar, "part-000000.parquet"), index=False)
+        # same rows in both: equal mtimes mark the pair as in sync (export_excel)
+        mtime = os.path.getmtime(sidecar)
+        os.utime(path, (mtime, mtime))
+    except Exception as e:
+        # mixed-type columns can't be stored as Parquet; drop the stale sidecar
+        print(f"[WARN] Could not write Parquet sidecar {sidecar}: {e}")
+        _remove_sidecar(sidecar)
+
+
+def append_export(df_new, path):
+    """
+    Append rows to the Parquet sidecar as one new part file, leaving the Excel
+    file as it is (export_excel regenerates it). Returns False, writing nothing,
+    when there is no current sidecar to append to; the caller then needs a full
+    write_export.
+    """
+    sidecar = parquet_sidecar(path)
+    if not os.path.isdir(sidecar) or not _sidecar_is_current(path):
+        return False
+    parts = _sidecar_parts(sidecar)
+    if not parts:
+        return False
+
+    # written under a dot-name (skipped by Parquet readers), then renamed in
+    tmp_path = os.path.join(sidecar, ".part.tmp")
+    try:
+        schema = pq.read_schema(parts[0])
+        table = pa.Table.from_pandas(df_new, schema=schema, preserve_index=False)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(sidecar, f"part-{len(parts):06d}.parquet"))
+    except Exception as e:
+        print(f"[WARN] Could not append to Parquet sidecar {sidecar}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def export_excel(path):
+    """
+    Rewrite the Excel file from its Parquet sidecar when the sidecar is newer,
+    compacting the sidecar's part files into one on the way.
+    """
+    sidecar = parquet_sidecar(path)
+    if not os.path.exists(sidecar) or (
+        os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(sidecar)
+    ):
+        return False
+    write_export(read_export(path), path)
+    return True